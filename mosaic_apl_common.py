@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Settings shared by 'submit_apl_lotus.py' and 'mosaic_apl_lines.py'
+for mosaicking lines mapped using APL.
+
+Kept separate from 'mosaic_apl_lines.py' so 'submit_apl_lotus.py' can
+use them without GDAL and NumPy being available.
+
+Creation Date: 19/10/2026
+
+"""
+
+#: Rules available for choosing which line to use where lines overlap
+OVERLAP_RULES = ["nadir", "last", "first"]
+
+#: Default overlap rule
+DEFAULT_OVERLAP_RULE = "nadir"
+
+#: Default factor to reduce resolution by for quicklook
+DEFAULT_QUICKLOOK_SCALE = 10
+
+def parse_quicklook_bands(quicklook_bands, num_bands=None):
+    """
+    Parse a space separated list of three bands (starting at 1) to use for
+    red, green and blue in a quicklook.
+
+    Requires:
+
+    * quicklook_bands - Space separated list of bands (e.g., "30 20 10")
+    * num_bands - Number of bands in the mapped files. If provided
+                  bands are checked against this (optional)
+
+    Raises a ValueError if the bands aren't valid.
+
+    """
+    try:
+        bands = [int(b) for b in quicklook_bands.split()]
+    except ValueError:
+        raise ValueError("Quicklook bands '{}' must be a space separated list "
+                         "of integers".format(quicklook_bands))
+
+    if len(bands) != 3:
+        raise ValueError("Need three bands for RGB quicklook, "
+                         "{} were provided".format(len(bands)))
+
+    for band in bands:
+        if band < 1 or (num_bands is not None and band > num_bands):
+            if num_bands is None:
+                raise ValueError("Quicklook band {} is not valid, bands "
+                                 "start at 1".format(band))
+            raise ValueError("Quicklook band {} is not valid, mapped files "
+                             "have bands 1 - {}".format(band, num_bands))
+
+    return bands
@@ -0,0 +1,644 @@
+#!/usr/bin/env python2.7
+# -*- coding: utf-8 -*-
+"""
+A script to mosaic lines of hyperspectral data mapped using APL
+and create a reduced resolution RGB quicklook of the flight.
+
+The mosaic is written as a GDAL VRT so the mapped lines don't need
+to be copied. The quicklook is created using windowed reads of the
+mosaic so memory use doesn't depend on the size of the flight.
+
+Designed to be run as the final LOTUS job from 'submit_apl_lotus.py'
+(using '--mosaic') but can also be run on existing mapped data.
+
+Requires the GDAL Python bindings and NumPy. The 'nadir' overlap
+rule needs row/column maps exported by aplmap ('*_rowcol.bil') and
+GDAL >= 3.3 (for the 'UseMaskBand' VRT source option).
+
+Creation Date: 19/10/2026
+
+"""
+from __future__ import print_function
+import argparse
+import glob
+import os
+import re
+import sys
+import xml.etree.ElementTree as ElementTree
+
+import numpy
+from osgeo import gdal
+
+from mosaic_apl_common import (OVERLAP_RULES, DEFAULT_OVERLAP_RULE,
+                               DEFAULT_QUICKLOOK_SCALE, parse_quicklook_bands)
+
+gdal.UseExceptions()
+
+#: Minimum GDAL version (as returned by gdal.VersionInfo) for 'nadir' rule
+NADIR_MIN_GDAL_VERSION = 3030000
+
+#: Band in the APL row/column map containing the level1b column (sample)
+ROWCOL_COLUMN_BAND = 2
+
+#: Value used for pixels outside a row/column map when resampled to the
+#: mosaic grid. Can't be a real column.
+ROWCOL_OUTSIDE_VALUE = -1
+
+#: No data value used for mapped lines if not set in the header
+#: (aplmap and aplmask use 0)
+DEFAULT_MAPPED_NODATA = 0
+
+#: Size (in pixels) of windows used for block-wise processing
+BLOCK_SIZE = 1024
+
+#: Wavelengths (nm) used to pick red, green and blue bands for the quicklook
+#: if they aren't specified.
+QUICKLOOK_WAVELENGTHS = [640, 550, 460]
+
+#: Maximum size (pixels) of decimated image used to calculate quicklook stretch
+STRETCH_SAMPLE_SIZE = 2000
+
+#: Percentiles used for linear stretch of quicklook
+STRETCH_PERCENTILES = [2, 98]
+
+def get_mapped_files_list(inmapped):
+    """
+    Get a list of mapped lines from a list of input files or a directory
+    containing a subdirectory for each line (as created by
+    'submit_apl_lotus.py').
+
+    Lines are sorted by name so they are in the order flown. Row/column
+    maps and lines which don't exist (e.g., the job failed) are skipped.
+    """
+    if os.path.isdir(inmapped[0]):
+        mapped_files_list = sorted([os.path.abspath(f) for f in
+                                    glob.glob(os.path.join(inmapped[0],
+                                                           "*", "*3b*.bil"))])
+    else:
+        mapped_files_list = sorted([os.path.abspath(f) for f in inmapped])
+
+    valid_mapped_files = []
+    for mapped_file in mapped_files_list:
+        if mapped_file.endswith("_rowcol.bil"):
+            continue
+        if not os.path.isfile(mapped_file):
+            print("Mapped file '{}' does not exist - skipping. Check log for "
+                  "the line".format(mapped_file), file=sys.stderr)
+            continue
+        valid_mapped_files.append(mapped_file)
+
+    return valid_mapped_files
+
+def get_band_count(mapped_files_list):
+    """
+    Get the number of bands in a list of mapped lines.
+
+    Raises an exception if lines have different numbers of bands
+    (e.g., Eagle and Hawk lines) as gdalbuildvrt would skip lines which
+    don't match the first.
+    """
+    band_counts = {}
+    for mapped_file in mapped_files_list:
+        mapped_ds = gdal.Open(mapped_file)
+        band_counts[mapped_file] = mapped_ds.RasterCount
+        mapped_ds = None
+
+    if len(set(band_counts.values())) > 1:
+        err_msg = "Mapped lines have different numbers of bands. Lines from "
+        err_msg += "different sensors need to be mosaicked separately:\n"
+        err_msg += "\n".join(["{} : {} bands".format(f, band_counts[f])
+                              for f in mapped_files_list])
+        raise Exception(err_msg)
+
+    return band_counts[mapped_files_list[0]]
+
+def get_rowcol_filename(mapped_file):
+    """
+    Get name of row/column map for a mapped line, using the same
+    naming as 'submit_apl_lotus.py'.
+    """
+    return mapped_file.replace(".bil","_rowcol.bil")
+
+def get_grid_window(dataset, mosaic_geotransform):
+    """
+    Get the location of a dataset within the mosaic grid as
+    (xoff, yoff, xsize, ysize).
+    """
+    geotransform = dataset.GetGeoTransform()
+    xoff = int(round((geotransform[0] - mosaic_geotransform[0]) /
+                     mosaic_geotransform[1]))
+    yoff = int(round((geotransform[3] - mosaic_geotransform[3]) /
+                     mosaic_geotransform[5]))
+    xsize = int(round(dataset.RasterXSize * geotransform[1] /
+                      mosaic_geotransform[1]))
+    ysize = int(round(dataset.RasterYSize * geotransform[5] /
+                      mosaic_geotransform[5]))
+    return xoff, yoff, xsize, ysize
+
+def get_valid_columns(column, nodata=None):
+    """
+    Get a boolean array of pixels in a row/column map column array
+    which contain a real column.
+    """
+    valid = column >= 0
+    if nodata is not None:
+        valid &= column != nodata
+    return valid
+
+def get_nadir_column(column_band):
+    """
+    Get the column for nadir (half the maximum column, as columns start at 0)
+    from the column band of a row/column map.
+
+    Only valid pixels are used for the maximum, read in blocks of BLOCK_SIZE
+    rows so memory use is bounded.
+    """
+    nodata = column_band.GetNoDataValue()
+    max_column = None
+    for yoff in range(0, column_band.YSize, BLOCK_SIZE):
+        ysize = min(BLOCK_SIZE, column_band.YSize - yoff)
+        column = column_band.ReadAsArray(0, yoff, column_band.XSize, ysize)
+        column = column[get_valid_columns(column, nodata)]
+        if column.size > 0:
+            block_max = float(column.max())
+            if max_column is None or block_max > max_column:
+                max_column = block_max
+    if max_column is None:
+        raise Exception("No valid pixels found in row/column map")
+    return max_column / 2.0
+
+def create_nadir_selection(mapped_files_list, mosaic_vrt, selection_file):
+    """
+    Create a raster on the mosaic grid containing the index (starting at 1)
+    of the line closest to nadir for each pixel, using the row/column map
+    for each line. Only pixels where the first band of the mapped line
+    contains data are used, so pixels masked by aplmask can be filled by
+    another line. Zero means no line covers the pixel.
+
+    Processed in blocks of BLOCK_SIZE so memory use is bounded.
+
+    Requires:
+
+    * mapped_files_list - List of mapped lines
+    * mosaic_vrt - VRT mosaic of all lines, used to define the output grid
+    * selection_file - Output file (GeoTIFF)
+
+    """
+    mosaic_ds = gdal.Open(mosaic_vrt)
+    mosaic_geotransform = mosaic_ds.GetGeoTransform()
+    x_size = mosaic_ds.RasterXSize
+    y_size = mosaic_ds.RasterYSize
+    proj_win = [mosaic_geotransform[0],
+                mosaic_geotransform[3],
+                mosaic_geotransform[0] + x_size * mosaic_geotransform[1],
+                mosaic_geotransform[3] + y_size * mosaic_geotransform[5]]
+
+    # Get column band for each line on the mosaic grid, the location of the
+    # line within the mosaic and the column for nadir. The column band is
+    # converted to floating point so pixels outside the line can be set
+    # to ROWCOL_OUTSIDE_VALUE. The first band of the mapped line is also
+    # put on the mosaic grid to check which pixels contain data.
+    lines_info = []
+    for line_num, mapped_file in enumerate(mapped_files_list):
+        rowcol_file = get_rowcol_filename(mapped_file)
+        if not os.path.isfile(rowcol_file):
+            raise Exception("Could not find row/column map '{}'. This is "
+                            "required for the 'nadir' overlap rule. Use a "
+                            "different rule or remap with "
+                            "'--mosaic'.".format(rowcol_file))
+        rowcol_ds = gdal.Open(rowcol_file)
+        column_band = rowcol_ds.GetRasterBand(ROWCOL_COLUMN_BAND)
+        nadir_column = get_nadir_column(column_band)
+
+        column_vrt = "/vsimem/rowcol_{}.vrt".format(line_num)
+        gdal.Translate(column_vrt, rowcol_ds, format="VRT",
+                       bandList=[ROWCOL_COLUMN_BAND],
+                       outputType=gdal.GDT_Float64,
+                       projWin=proj_win, width=x_size, height=y_size,
+                       noData=ROWCOL_OUTSIDE_VALUE)
+
+        mapped_ds = gdal.Open(mapped_file)
+        mapped_nodata = mapped_ds.GetRasterBand(1).GetNoDataValue()
+        if mapped_nodata is None:
+            mapped_nodata = DEFAULT_MAPPED_NODATA
+        data_vrt = "/vsimem/data_{}.vrt".format(line_num)
+        gdal.Translate(data_vrt, mapped_ds, format="VRT",
+                       bandList=[1],
+                       projWin=proj_win, width=x_size, height=y_size,
+                       noData=mapped_nodata)
+        mapped_ds = None
+
+        lines_info.append({"column_vrt" : column_vrt,
+                           "data_vrt" : data_vrt,
+                           "data_nodata" : mapped_nodata,
+                           "nadir_column" : nadir_column,
+                           "nodata" : column_band.GetNoDataValue(),
+                           "window" : get_grid_window(rowcol_ds,
+                                                      mosaic_geotransform)})
+        rowcol_ds = None
+
+    driver = gdal.GetDriverByName("GTiff")
+    selection_ds = driver.Create(selection_file, x_size, y_size, 1,
+                                 gdal.GDT_UInt16,
+                                 options=["TILED=YES", "COMPRESS=LZW"])
+    selection_ds.SetGeoTransform(mosaic_geotransform)
+    selection_ds.SetProjection(mosaic_ds.GetProjection())
+    selection_band = selection_ds.GetRasterBand(1)
+    selection_band.SetNoDataValue(0)
+
+    for block_yoff in range(0, y_size, BLOCK_SIZE):
+        block_ysize = min(BLOCK_SIZE, y_size - block_yoff)
+        for block_xoff in range(0, x_size, BLOCK_SIZE):
+            block_xsize = min(BLOCK_SIZE, x_size - block_xoff)
+
+            selection = numpy.zeros((block_ysize, block_xsize),
+                                    dtype=numpy.uint16)
+            best_distance = numpy.full((block_ysize, block_xsize), numpy.inf)
+
+            for line_num, line_info in enumerate(lines_info):
+                # Skip lines which don't overlap block
+                xoff, yoff, xsize, ysize = line_info["window"]
+                if (xoff >= block_xoff + block_xsize or
+                        xoff + xsize <= block_xoff or
+                        yoff >= block_yoff + block_ysize or
+                        yoff + ysize <= block_yoff):
+                    continue
+
+                column_ds = gdal.Open(line_info["column_vrt"])
+                column = column_ds.GetRasterBand(1).ReadAsArray(
+                    block_xoff, block_yoff, block_xsize, block_ysize)
+                column_ds = None
+                valid = get_valid_columns(column, line_info["nodata"])
+
+                data_ds = gdal.Open(line_info["data_vrt"])
+                data = data_ds.GetRasterBand(1).ReadAsArray(
+                    block_xoff, block_yoff, block_xsize, block_ysize)
+                data_ds = None
+                valid &= data != line_info["data_nodata"]
+
+                distance = numpy.abs(column - line_info["nadir_column"])
+                closer = valid & (distance < best_distance)
+                selection[closer] = line_num + 1
+                best_distance[closer] = distance[closer]
+
+            selection_band.WriteArray(selection, block_xoff, block_yoff)
+
+    selection_ds = None
+    mosaic_ds = None
+
+    for line_info in lines_info:
+        gdal.Unlink(line_info["column_vrt"])
+        gdal.Unlink(line_info["data_vrt"])
+
+def write_masked_line_vrt(mapped_file, line_num, selection_file,
+                          mosaic_geotransform, out_vrt):
+    """
+    Write a VRT for a mapped line with a mask band set to only the pixels
+    where the line was selected in the selection raster.
+
+    The mask is created from the selection raster using a lookup table
+    which sets pixels equal to the line index to 255 and all others to 0.
+    """
+    gdal.Translate(out_vrt, mapped_file, format="VRT")
+
+    line_ds = gdal.Open(mapped_file)
+    xoff, yoff, xsize, ysize = get_grid_window(line_ds, mosaic_geotransform)
+    line_index = line_num + 1
+
+    mask_band_xml = '''  <MaskBand>
+    <VRTRasterBand dataType="Byte">
+      <ComplexSource>
+        <SourceFilename relativeToVRT="0">{selection_file}</SourceFilename>
+        <SourceBand>1</SourceBand>
+        <SrcRect xOff="{xoff}" yOff="{yoff}" xSize="{xsize}" ySize="{ysize}" />
+        <DstRect xOff="0" yOff="0" xSize="{line_xsize}" ySize="{line_ysize}" />
+        <LUT>{below}:0,{index}:255,{above}:0</LUT>
+      </ComplexSource>
+    </VRTRasterBand>
+  </MaskBand>
+</VRTDataset>
+'''.format(selection_file=os.path.abspath(selection_file),
+           xoff=xoff, yoff=yoff, xsize=xsize, ysize=ysize,
+           line_xsize=line_ds.RasterXSize,
+           line_ysize=line_ds.RasterYSize,
+           below=line_index - 1, index=line_index, above=line_index + 1)
+    line_ds = None
+
+    with open(out_vrt, "r") as f:
+        vrt_text = f.read()
+
+    vrt_text = vrt_text.replace("</VRTDataset>", mask_band_xml)
+
+    with open(out_vrt, "w") as f:
+        f.write(vrt_text)
+
+def write_nadir_mosaic_vrt(mosaic_vrt, mapped_files_list, masked_lines_list):
+    """
+    Rewrite a VRT mosaic created by gdalbuildvrt so each source is
+    the masked VRT for the line, using the mask band of the source
+    (UseMaskBand) to select pixels.
+
+    Written explicitly rather than using gdalbuildvrt so selection
+    doesn't depend on how it handles input mask bands.
+    """
+    mosaic_dir = os.path.dirname(os.path.abspath(mosaic_vrt))
+    masked_lines_lookup = dict(zip([os.path.abspath(f) for f in mapped_files_list],
+                                   masked_lines_list))
+
+    mosaic_tree = ElementTree.parse(mosaic_vrt)
+    for band_element in mosaic_tree.getroot().findall("VRTRasterBand"):
+        for source_element in list(band_element):
+            if source_element.tag not in ["SimpleSource", "ComplexSource"]:
+                continue
+            filename_element = source_element.find("SourceFilename")
+            source_filename = filename_element.text
+            if filename_element.get("relativeToVRT") == "1":
+                source_filename = os.path.join(mosaic_dir, source_filename)
+            source_filename = os.path.abspath(source_filename)
+
+            filename_element.text = os.path.abspath(
+                masked_lines_lookup[source_filename])
+            filename_element.set("relativeToVRT", "0")
+            # Mask band already excludes pixels not covered by the line,
+            # so only use the mask to select pixels.
+            nodata_element = source_element.find("NODATA")
+            if nodata_element is not None:
+                source_element.remove(nodata_element)
+            source_element.tag = "ComplexSource"
+            ElementTree.SubElement(source_element, "UseMaskBand").text = "true"
+
+    mosaic_tree.write(mosaic_vrt)
+
+def create_mosaic(mapped_files_list, out_vrt, overlap_rule=DEFAULT_OVERLAP_RULE):
+    """
+    Create a VRT mosaic of mapped lines.
+
+    Requires:
+
+    * mapped_files_list - List of mapped lines
+    * out_vrt - Output VRT file
+    * overlap_rule - Rule for selecting which line to use where lines overlap:
+       * nadir - pixel closest to nadir (requires row/column maps)
+       * last - last line in list is on top
+       * first - first line in list is on top
+
+    """
+    if overlap_rule not in OVERLAP_RULES:
+        raise Exception("Overlap rule '{}' not recognised. Options are: "
+                        "{}".format(overlap_rule, ", ".join(OVERLAP_RULES)))
+
+    get_band_count(mapped_files_list)
+
+    if (overlap_rule == "nadir" and
+            int(gdal.VersionInfo("VERSION_NUM")) < NADIR_MIN_GDAL_VERSION):
+        raise Exception("The 'nadir' overlap rule requires GDAL 3.3 or later, "
+                        "found {}. Use a different rule or newer "
+                        "GDAL.".format(gdal.VersionInfo("RELEASE_NAME")))
+
+    # gdalbuildvrt puts the last file on top
+    if overlap_rule == "first":
+        gdal.BuildVRT(out_vrt, list(reversed(mapped_files_list)))
+        return
+    gdal.BuildVRT(out_vrt, mapped_files_list)
+    if overlap_rule == "last":
+        return
+
+    # For nadir first create selection raster on the grid of the
+    # mosaic created above then change sources to masked lines.
+    out_base = os.path.splitext(out_vrt)[0]
+    selection_file = out_base + "_nadir_selection.tif"
+    print("Selecting pixels closest to nadir")
+    create_nadir_selection(mapped_files_list, out_vrt, selection_file)
+
+    mosaic_ds = gdal.Open(out_vrt)
+    mosaic_geotransform = mosaic_ds.GetGeoTransform()
+    mosaic_ds = None
+
+    masked_lines_list = []
+    for line_num, mapped_file in enumerate(mapped_files_list):
+        line_basename = os.path.splitext(os.path.basename(mapped_file))[0]
+        masked_line_vrt = "{}_{}_nadir.vrt".format(out_base, line_basename)
+        write_masked_line_vrt(mapped_file, line_num, selection_file,
+                              mosaic_geotransform, masked_line_vrt)
+        masked_lines_list.append(masked_line_vrt)
+
+    write_nadir_mosaic_vrt(out_vrt, mapped_files_list, masked_lines_list)
+
+def get_header_wavelengths(mapped_file):
+    """
+    Get wavelengths from the 'wavelength = {...}' field of the ENVI
+    header for a mapped line.
+
+    Returns None if the header or field can't be found.
+    """
+    for header_file in [mapped_file + ".hdr",
+                        os.path.splitext(mapped_file)[0] + ".hdr"]:
+        if not os.path.isfile(header_file):
+            continue
+        with open(header_file, "r") as f:
+            header_text = f.read()
+        wavelength_match = re.search(r"^\s*wavelength\s*=\s*{([^}]*)}",
+                                     header_text,
+                                     re.IGNORECASE | re.MULTILINE)
+        if wavelength_match is None:
+            return None
+        return [float(w) for w in wavelength_match.group(1).split(",")
+                if w.strip() != ""]
+    return None
+
+def get_quicklook_bands(mapped_file):
+    """
+    Get bands closest to the red, green and blue wavelengths in
+    QUICKLOOK_WAVELENGTHS using the wavelengths of a mapped line.
+
+    Wavelengths are read from the GDAL band metadata, or if not available
+    from the ENVI header. The VRT mosaic can't be used as gdalbuildvrt
+    doesn't copy band metadata.
+
+    Returns None if wavelengths aren't available.
+    """
+    dataset = gdal.Open(mapped_file)
+    wavelengths = []
+    for band_num in range(1, dataset.RasterCount + 1):
+        wavelength = dataset.GetRasterBand(band_num).GetMetadataItem("wavelength")
+        if wavelength is None:
+            wavelengths = get_header_wavelengths(mapped_file)
+            break
+        wavelengths.append(float(wavelength))
+
+    num_bands = dataset.RasterCount
+    dataset = None
+    if wavelengths is None or len(wavelengths) != num_bands:
+        return None
+
+    wavelengths = numpy.array(wavelengths)
+    # Convert micrometres to nanometres
+    if wavelengths.max() < 100:
+        wavelengths = wavelengths * 1000
+    return [int(numpy.argmin(numpy.abs(wavelengths - target))) + 1
+            for target in QUICKLOOK_WAVELENGTHS]
+
+def get_stretch_limits(band, nodata=0):
+    """
+    Get limits for a linear stretch of a band from a decimated read
+    of no more than STRETCH_SAMPLE_SIZE pixels along each side.
+    """
+    scale = max(1, float(max(band.XSize, band.YSize)) / STRETCH_SAMPLE_SIZE)
+    sample = band.ReadAsArray(buf_xsize=max(1, int(band.XSize / scale)),
+                              buf_ysize=max(1, int(band.YSize / scale)))
+    sample = sample[sample != nodata]
+    if sample.size == 0:
+        return 0, 1
+    lower, upper = numpy.percentile(sample, STRETCH_PERCENTILES)
+    if upper <= lower:
+        upper = lower + 1
+    return lower, upper
+
+def create_quicklook(in_file, out_quicklook, bands,
+                     scale=DEFAULT_QUICKLOOK_SCALE):
+    """
+    Create a reduced resolution 8-bit RGB quicklook (GeoTIFF with overviews)
+    of selected bands.
+
+    Data are read in windows of BLOCK_SIZE quicklook pixels so memory use
+    doesn't depend on the size of the input.
+
+    Requires:
+
+    * in_file - Input file (e.g., VRT mosaic)
+    * out_quicklook - Output GeoTIFF
+    * bands - List of three bands (starting at 1) to use for red, green and
+              blue
+    * scale - Factor to reduce resolution by (optional)
+
+    """
+    in_ds = gdal.Open(in_file)
+
+    if len(bands) != 3:
+        raise Exception("Need three bands for RGB quicklook, "
+                        "{} were provided".format(len(bands)))
+    print("Creating quicklook using bands: {}".format(
+          " ".join([str(b) for b in bands])))
+
+    in_bands = [in_ds.GetRasterBand(b) for b in bands]
+    nodata_values = [b.GetNoDataValue() for b in in_bands]
+    nodata_values = [0 if n is None else n for n in nodata_values]
+    stretch_limits = [get_stretch_limits(b, n)
+                      for b, n in zip(in_bands, nodata_values)]
+
+    out_x_size = max(1, in_ds.RasterXSize // scale)
+    out_y_size = max(1, in_ds.RasterYSize // scale)
+    in_geotransform = in_ds.GetGeoTransform()
+    out_geotransform = (in_geotransform[0], in_geotransform[1] * scale,
+                        in_geotransform[2], in_geotransform[3],
+                        in_geotransform[4], in_geotransform[5] * scale)
+
+    driver = gdal.GetDriverByName("GTiff")
+    out_ds = driver.Create(out_quicklook, out_x_size, out_y_size, 3,
+                           gdal.GDT_Byte,
+                           options=["TILED=YES", "COMPRESS=DEFLATE",
+                                    "PHOTOMETRIC=RGB"])
+    out_ds.SetGeoTransform(out_geotransform)
+    out_ds.SetProjection(in_ds.GetProjection())
+
+    for out_yoff in range(0, out_y_size, BLOCK_SIZE):
+        out_ysize = min(BLOCK_SIZE, out_y_size - out_yoff)
+        for out_xoff in range(0, out_x_size, BLOCK_SIZE):
+            out_xsize = min(BLOCK_SIZE, out_x_size - out_xoff)
+
+            for out_band_num, in_band in enumerate(in_bands):
+                data = in_band.ReadAsArray(out_xoff * scale, out_yoff * scale,
+                                           out_xsize * scale, out_ysize * scale,
+                                           buf_xsize=out_xsize,
+                                           buf_ysize=out_ysize)
+                lower, upper = stretch_limits[out_band_num]
+                # Scale to 1 - 255, keeping 0 for no data
+                stretched = (data.astype(numpy.float32) - lower) / (upper - lower)
+                stretched = numpy.clip(stretched * 254 + 1, 1, 255)
+                stretched[data == nodata_values[out_band_num]] = 0
+
+                out_band = out_ds.GetRasterBand(out_band_num + 1)
+                out_band.WriteArray(stretched.astype(numpy.uint8),
+                                    out_xoff, out_yoff)
+
+    for out_band_num in range(1, 4):
+        out_ds.GetRasterBand(out_band_num).SetNoDataValue(0)
+
+    out_ds.BuildOverviews("AVERAGE", [2, 4, 8, 16])
+    out_ds = None
+    in_ds = None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create a VRT mosaic and RGB "
+                                                 "quicklook from lines mapped "
+                                                 "using APL")
+
+    parser.add_argument("inmapped", nargs="+",
+                        type=str, help="Input mapped files or directory "
+                                       "containing a subdirectory for each line")
+    parser.add_argument("--outmosaic", type=str,
+                        help="Output VRT mosaic",
+                        required=True, default=None)
+    parser.add_argument("--overlap", type=str,
+                        help="Rule for selecting line where lines overlap "
+                             "(default = {})".format(DEFAULT_OVERLAP_RULE),
+                        choices=OVERLAP_RULES,
+                        required=False, default=DEFAULT_OVERLAP_RULE)
+    parser.add_argument("--quicklook", action="store_true",
+                        help="Create RGB quicklook of mosaic",
+                        required=False, default=False)
+    parser.add_argument("--quicklook_bands", type=str,
+                        help="Bands in the mapped files to use for red, green "
+                             "and blue as space separated list (default = "
+                             "closest to {} nm)".format(
+                             " ".join([str(w) for w in QUICKLOOK_WAVELENGTHS])),
+                        required=False, default=None)
+    parser.add_argument("--quicklook_scale", type=int,
+                        help="Factor to reduce resolution by for quicklook "
+                             "(default = {})".format(DEFAULT_QUICKLOOK_SCALE),
+                        required=False, default=DEFAULT_QUICKLOOK_SCALE)
+    args = parser.parse_args()
+
+    if args.quicklook_scale < 1:
+        parser.error("'--quicklook_scale' must be 1 or more")
+
+    mapped_files_list = get_mapped_files_list(args.inmapped)
+    if len(mapped_files_list) == 0:
+        print("No mapped files were found", file=sys.stderr)
+        sys.exit(1)
+
+    num_bands = get_band_count(mapped_files_list)
+
+    out_mosaic = os.path.abspath(args.outmosaic)
+    out_mosaic_dir = os.path.dirname(out_mosaic)
+    if not os.path.isdir(out_mosaic_dir):
+        print("Output directory '{}' does not exist - creating it now".format(out_mosaic_dir))
+        os.makedirs(out_mosaic_dir)
+
+    # Select quicklook bands before mosaicking so any problems are found
+    # before the time consuming steps.
+    if args.quicklook:
+        if args.quicklook_bands is not None:
+            try:
+                quicklook_bands = parse_quicklook_bands(args.quicklook_bands,
+                                                        num_bands)
+            except ValueError as err:
+                parser.error(str(err))
+        else:
+            quicklook_bands = get_quicklook_bands(mapped_files_list[0])
+            if quicklook_bands is None:
+                print("Could not find wavelengths for '{}' to select quicklook "
+                      "bands. Specify bands using "
+                      "'--quicklook_bands'".format(mapped_files_list[0]),
+                      file=sys.stderr)
+                sys.exit(1)
+
+    print("Creating mosaic of {} lines".format(len(mapped_files_list)))
+    create_mosaic(mapped_files_list, out_mosaic, args.overlap)
+    print("Saved mosaic to: {}".format(out_mosaic))
+
+    if args.quicklook:
+        out_quicklook = os.path.splitext(out_mosaic)[0] + "_quicklook.tif"
+        create_quicklook(out_mosaic, out_quicklook, quicklook_bands,
+                         args.quicklook_scale)
+        print("Saved quicklook to: {}".format(out_quicklook))
@@ -12,9 +12,13 @@ from __future__ import print_function
 import argparse
 import glob
 import os
+import re
 import subprocess
 import sys
 
+from mosaic_apl_common import (OVERLAP_RULES, DEFAULT_OVERLAP_RULE,
+                               DEFAULT_QUICKLOOK_SCALE, parse_quicklook_bands)
+
 #: Default pixel size
 DEFAULT_PIXEL_SIZE = 2
 
@@ -28,6 +32,19 @@ OSTN02_NTV2_BIN_FILE = "/apps/contrib/arsf/arsf_common/ostn02/OSTN02_NTv2.gsb"
 #: Wall time. Maximum time jobs have to run
 WALL_TIME = "06:00"
 
+#: Wall time for job to mosaic all lines
+MOSAIC_WALL_TIME = "12:00"
+
+#: Sensor names used for mosaics, from the first letter of the level1b file
+#: (lines from each sensor are mosaicked separately)
+SENSOR_NAMES = {"e" : "eagle",
+                "h" : "hawk",
+                "f" : "fenix"}
+
+#: Script used to create mosaic and quicklook
+MOSAIC_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "mosaic_apl_lines.py")
+
 def get_line_parameters(level1b_file, mask_directory, nav_directory, outproj,
                         dem_file,
                         out_dir_base,
@@ -180,9 +197,13 @@ def write_bsub_script_for_dict(line_parameters, output_filename,
  apltran -inproj latlong WGS84 -igm {igm_filename} -output {transformed_igm_filename} -outproj {output_projection}
 
  # Map file
- aplmap -igm {transformed_igm_filename} -ignorediskspace -lev1 {masked_1b_filename} -mapname {output_filename} -outputdatatype {outputdatatype} -pixelsize {pixel_size} {pixel_size} -bandlist {bands}
+ aplmap -igm {transformed_igm_filename} -ignorediskspace -lev1 {masked_1b_filename} -mapname {output_filename} -outputdatatype {outputdatatype} -pixelsize {pixel_size} {pixel_size} -bandlist {bands}'''.format(**line_parameters)
 
- '''.format(**line_parameters)
+    # Export row/column map (needed for nadir mosaic)
+    if line_parameters["rowcol_filename"] is not None:
+        bsub_script_text += " -rowcolmap {rowcol_filename}".format(**line_parameters)
+
+    bsub_script_text += "\n\n "
 
     if zip_mapped:
         bsub_script_text += '''
@@ -194,6 +215,46 @@ def write_bsub_script_for_dict(line_parameters, output_filename,
     with open(output_filename,"w") as f:
         f.write(bsub_script_text)
 
+def write_mosaic_bsub_script_for_dict(mosaic_parameters, output_filename):
+    """
+    Write dictionary of mosaic parameters to a bsub script which
+    creates a VRT mosaic and RGB quicklook of all mapped lines.
+    """
+    bsub_script_text = '''#!/bin/bash
+ #BSUB -J {mosaic_basename}
+ #BSUB -o {scripts_dir}/%J.o
+ #BSUB -e {scripts_dir}/%J.e
+ #BSUB -q short-serial
+ #BSUB -W {wall_time}
+ #BSUB -M 8000
+ #BSUB -n 1
+
+ # Load Python environment with GDAL
+ module load jaspy
+
+ # Mosaic lines and create quicklook
+ python {mosaic_script} --outmosaic {mosaic_filename} --overlap {overlap} --quicklook --quicklook_scale {quicklook_scale}'''.format(**mosaic_parameters)
+
+    if mosaic_parameters["quicklook_bands"] is not None:
+        bsub_script_text += ' --quicklook_bands "{quicklook_bands}"'.format(**mosaic_parameters)
+
+    bsub_script_text += " {}\n\n ".format(" ".join(mosaic_parameters["mapped_files"]))
+
+    with open(output_filename,"w") as f:
+        f.write(bsub_script_text)
+
+def get_bsub_job_id(bsub_output):
+    """
+    Get the job ID from the output of bsub
+    (e.g., 'Job <1234> is submitted to queue <short-serial>.')
+
+    Returns None if the job ID couldn't be found.
+    """
+    job_id_match = re.search(r"Job <(\d+)>", bsub_output)
+    if job_id_match is None:
+        return None
+    return job_id_match.group(1)
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Produce scripts for submitting"
                                                  " data to be processed on as "
@@ -240,8 +301,40 @@ if __name__ == "__main__":
     parser.add_argument("--zip", action="store_true",
                         help="Zip mapped files after processing",
                         required=False, default=False)
+    parser.add_argument("--mosaic", action="store_true",
+                        help="Submit a final job to create a VRT mosaic and "
+                             "RGB quicklook of all lines once they have "
+                             "finished",
+                        required=False, default=False)
+    parser.add_argument("--mosaic_overlap", type=str,
+                        help="Rule for selecting line where lines overlap in "
+                             "mosaic (default = {}). 'nadir' uses pixel "
+                             "closest to nadir and exports a row/column map "
+                             "for each line".format(DEFAULT_OVERLAP_RULE),
+                        choices=OVERLAP_RULES,
+                        required=False, default=DEFAULT_OVERLAP_RULE)
+    parser.add_argument("--quicklook_bands", type=str,
+                        help="Bands in mapped files to use for red, green and "
+                             "blue in mosaic quicklook as space separated list "
+                             "(default = select using wavelength)",
+                        required=False, default=None)
+    parser.add_argument("--quicklook_scale", type=int,
+                        help="Factor to reduce resolution by for mosaic "
+                             "quicklook (default = {})".format(DEFAULT_QUICKLOOK_SCALE),
+                        required=False, default=DEFAULT_QUICKLOOK_SCALE)
     args = parser.parse_args()
 
+    if args.quicklook_scale < 1:
+        parser.error("'--quicklook_scale' must be 1 or more")
+
+    # Number of bands isn't known until lines are mapped so only the
+    # format can be checked here.
+    if args.quicklook_bands is not None:
+        try:
+            parse_quicklook_bands(args.quicklook_bands)
+        except ValueError as err:
+            parser.error(str(err))
+
     if os.path.isdir(args.inlevel1b[0]):
         level1b_dir = os.path.abspath(args.inlevel1b[0])
         # Get a list of input files
@@ -277,6 +370,11 @@ if __name__ == "__main__":
         print("Output scripts directory '{}' does not exist - creating it now".format(output_scripts))
         os.makedirs(output_scripts)
 
+    # Keep track of mapped files and jobs for each sensor to create mosaics.
+    # If a job ID can't be found the job name is used instead.
+    sensor_lines = {}
+    num_submitted = 0
+
     for line_num, level1b_file in enumerate(level1b_files_list):
 
         l1b_basename = os.path.split(level1b_file)[-1]
@@ -292,14 +390,26 @@ if __name__ == "__main__":
                                               output_dir,
                                               view_vectors=args.view_vectors,
                                               pixel_size=args.pixel_size,
-                                              bands=args.bands)
+                                              bands=args.bands,
+                                              rowcolmap=(args.mosaic and
+                                                         args.mosaic_overlap == "nadir"))
 
         line_parameters["scripts_dir"] = output_scripts
         out_bsub_script = os.path.join(output_scripts,
                                        "{}_process.bsub".format(l1b_basename))
         write_bsub_script_for_dict(line_parameters, out_bsub_script, args.zip)
 
+        sensor = SENSOR_NAMES.get(l1b_basename[0], l1b_basename[0])
+        if sensor not in sensor_lines:
+            sensor_lines[sensor] = {"mapped_files" : [],
+                                    "job_names" : [],
+                                    "job_ids" : []}
+        sensor_lines[sensor]["mapped_files"].append(line_parameters["output_filename"])
+        sensor_lines[sensor]["job_names"].append(l1b_basename)
+        output_projection_string = line_parameters["output_projection_string"]
+
         submit_cmd = ["bsub",
+                      "-J",l1b_basename,
                       "-q","short-serial",
                       "-o",os.path.join(output_scripts,"{}_%J.o".format(l1b_basename)),
                       "-e",os.path.join(output_scripts,"{}_%J.e".format(l1b_basename)),
@@ -311,11 +421,91 @@ if __name__ == "__main__":
         if args.submit:
             print(" ".join(submit_cmd))
             # Need to use "shell=True" for redirect
-            subprocess.call(" ".join(submit_cmd),shell=True)
+            try:
+                bsub_output = subprocess.check_output(" ".join(submit_cmd),
+                                                      shell=True)
+            except subprocess.CalledProcessError as err:
+                print("Failed to submit job for {}: {}".format(l1b_basename,
+                                                               err),
+                      file=sys.stderr)
+                continue
+            bsub_output = bsub_output.decode()
+            print(bsub_output.strip())
+            num_submitted += 1
+            # Get job ID so mosaic depends on this job rather than any
+            # job with the same name.
+            line_job_id = get_bsub_job_id(bsub_output)
+            if line_job_id is None:
+                print("Could not get job ID for {} from bsub output, mosaic "
+                      "will depend on job name".format(l1b_basename),
+                      file=sys.stderr)
+                sensor_lines[sensor]["job_ids"].append(l1b_basename)
+            else:
+                sensor_lines[sensor]["job_ids"].append(line_job_id)
         else:
             print("Submit job using:")
             print(" ".join(submit_cmd))
 
+    if args.mosaic:
+        # Submit a mosaic job for each sensor as lines from different sensors
+        # have different bands.
+        for sensor in sorted(sensor_lines.keys()):
+            if args.submit and len(sensor_lines[sensor]["job_ids"]) == 0:
+                print("No {} line jobs were submitted, not submitting mosaic "
+                      "job".format(sensor), file=sys.stderr)
+                continue
+
+            print("*** Mosaic {} ***".format(sensor))
+            mosaic_parameters = {}
+            mosaic_parameters["mosaic_basename"] = "mosaic_{}_{}".format(sensor,
+                                                       output_projection_string)
+            mosaic_parameters["scripts_dir"] = output_scripts
+            mosaic_parameters["wall_time"] = MOSAIC_WALL_TIME
+            mosaic_parameters["mosaic_script"] = MOSAIC_SCRIPT
+            mosaic_parameters["mosaic_filename"] = os.path.join(output_dir, "mosaic",
+                                                  "{}.vrt".format(mosaic_parameters["mosaic_basename"]))
+            mosaic_parameters["overlap"] = args.mosaic_overlap
+            mosaic_parameters["quicklook_bands"] = args.quicklook_bands
+            mosaic_parameters["quicklook_scale"] = args.quicklook_scale
+            mosaic_parameters["mapped_files"] = sensor_lines[sensor]["mapped_files"]
+
+            out_bsub_script = os.path.join(output_scripts,
+                                           "mosaic_{}_process.bsub".format(sensor))
+            write_mosaic_bsub_script_for_dict(mosaic_parameters, out_bsub_script)
+
+            # Run once all lines have finished (successfully or not), lines
+            # which failed are skipped by the mosaic script. Use job IDs if
+            # submitting, otherwise use names as IDs aren't known yet.
+            if args.submit:
+                line_jobs = sensor_lines[sensor]["job_ids"]
+            else:
+                line_jobs = sensor_lines[sensor]["job_names"]
+            dependency = " && ".join(["ended({})".format(j) for j in line_jobs])
+
+            submit_cmd = ["bsub",
+                          "-J",mosaic_parameters["mosaic_basename"],
+                          "-w","'{}'".format(dependency),
+                          "-q","short-serial",
+                          "-o",os.path.join(output_scripts,"mosaic_{}_%J.o".format(sensor)),
+                          "-e",os.path.join(output_scripts,"mosaic_{}_%J.e".format(sensor)),
+                          "-W",MOSAIC_WALL_TIME,
+                          "-M", "8000",
+                          "-n","1",
+                          "<",out_bsub_script]
+
+            if args.submit:
+                print(" ".join(submit_cmd))
+                # Need to use "shell=True" for redirect
+                if subprocess.call(" ".join(submit_cmd),shell=True) == 0:
+                    print("Submitted {} mosaic job".format(sensor))
+                else:
+                    print("Failed to submit {} mosaic job".format(sensor),
+                          file=sys.stderr)
+            else:
+                print("Submit job using:")
+                print(" ".join(submit_cmd))
+
     if args.submit:
-        print("Submitted {} jobs".format(len(level1b_files_list)))
+        print("Submitted {} of {} line jobs".format(num_submitted,
+                                                    len(level1b_files_list)))
         print("Check status using bjobs")